@@ -12,46 +12,304 @@
 #
 # Instructions for use:
 #
-# 1. Install Python 3 (code written and tested in Python 3.6.4 on Windows in Powershell)
+# 1. Install Python 3.7 or newer (code written and tested in Python 3.6.4 on Windows
+#    in Powershell)
 # 2. Add the environment variable 'GITHUB_TOKEN' with a personal access token
 #    generated at 'https://github.com/settings/tokens' as the value
 # 3. Run `pip install` for  `requests` module
 #       - Other required modules you may need to install:
 #           - `argparse`
+#       - Optional modules:
+#           - `orjson` (faster decoding of search results)
+#           - `requests-cache` (caches search results on disk between runs)
 # 4. Pull the code
 # 5. Open terminal/cmd/powershell
 # 6. Run `<path to python executable> <path to this file>/<this filename>`
 #       - Adding a `-g` to the end will start up the GUI version.
+#       - Adding a `--no-cache` to the end will turn off the on disk cache of
+#         search results.
 # 7. Follow the instructions as they appear on the terminal/GUI.
 #       - GUI search works with both hitting the enter key and clicking the `Search` button.
 #       - Searching does take some time, depending on the internet connection/size
 #         of the results.
 
 import os
-import re
 import sys
 import time
+import queue
+import threading
+from collections import OrderedDict, deque
+from itertools import islice
 from tkinter import *
 import argparse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
 # from pprint import pprint
 from datetime import datetime
+# requests-cache keeps search results on disk between runs, but is optional.
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+# orjson decodes the API responses several times faster than the built in
+# json module, but is optional.
+try:
+    from orjson import loads as loadJson
+except ImportError:
+    from json import loads as loadJson
 
 # ^authKey has to be valid for:
 #   under repo: repo:status, public_repo
 #   under admin:org: read:org,
 #   under user: read:user, user:email
 #
+# Read once when the application starts and sent with every query by SESSION.
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+
+# Number of requests allowed in flight at once. Kept low so that parallel
+# searches do not trip GitHub's secondary (abuse) rate limits. Both pools below
+# send requests, so the limit is enforced by REQUEST_SLOTS in apiRequest.
+MAX_WORKERS = 8
+REQUEST_SLOTS = threading.BoundedSemaphore(MAX_WORKERS)
+# Every concurrent lookup is run on this one pool, so MAX_WORKERS caps the
+# lookups in flight across the whole application and the worker threads are
+# reused between searches. Tasks run here must not wait on other tasks queued
+# here, or the pool can deadlock once every worker is waiting.
+EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+# Python runs every task still queued on the pools before it exits, so once
+# the application is closing (see cancelRequests) queued requests give up
+# straight away instead of each still going out to GitHub.
+closing = threading.Event()
+# Requests for the next pages of results, made while the current page is being
+# handled (see followPages). These never wait on other tasks, so lookups
+# running on EXECUTOR can safely wait on them.
+PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+# Number of pages of a single query queued ahead of the page being handled.
+# They are still sent no more than MAX_WORKERS at a time.
+PAGE_PREFETCH_COUNT = MAX_WORKERS
+# Every query goes to api.github.com, so one pool of kept-alive connections is
+# shared by all threads. No more than MAX_WORKERS requests are ever in flight,
+# so it has room for a connection per request and no connection ever has to
+# be thrown away and opened again with a new TLS handshake.
+CONNECTION_POOL_SIZE = MAX_WORKERS
+
+# Longest time in seconds to wait for GitHub to answer a single request, so a
+# stalled connection cannot hold up a search forever. This is well above the
+# time GitHub itself allows a GraphQL query to run.
+REQUEST_TIMEOUT = 30
+
+# How many times a rate limited request is retried, and the longest wait in
+# seconds that is worth sitting through before reporting the limit instead.
+RATE_LIMIT_RETRIES = 3
+MAX_RATE_LIMIT_WAIT = 60
+# When fewer requests than this are left before GitHub's rate limit, requests
+# are held back until the limit resets instead of running into it, as long as
+# it resets within MAX_RATE_LIMIT_WAIT seconds. The REST and GraphQL APIs have
+# separate limits, so they are held back separately.
+RATE_LIMIT_LOW_REMAINING = 10
+rateLimitResumeTimes = {}
+rateLimitLock = threading.Lock()
+
+# Users and organization member lists that have already been looked up, so
+# searching several organizations with members in common, or repeating a
+# search, does not ask GitHub again. Entries are dropped after the given
+# number of seconds so changes on GitHub still show up in a long session.
+# Names are not case sensitive on GitHub, so they are stored lowercased.
+USER_INFO_CACHE_SIZE = 4096
+USER_INFO_CACHE_TTL = 1800
+ORG_MEMBERS_CACHE_SIZE = 256
+ORG_MEMBERS_CACHE_TTL = 300
+
+# Most recent responses, keyed by url, used to make conditional requests.
+# Pages of commits can be large, so the cache is limited by the total size of
+# the response bodies it holds rather than by the number of responses.
+ETAG_CACHE_BYTES = 32 * 1024 * 1024
+etagCache = OrderedDict()
+etagCacheBytes = 0
+etagCacheLock = threading.Lock()
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+# Checking the rate limit does not count against it, which makes it a free
+# request for opening a connection ahead of the first search.
+RATE_LIMIT_URL = "https://api.github.com/rate_limit"
+# Number of users looked up per GraphQL request.
+GRAPHQL_BATCH_SIZE = 100
+# Number of repos whose commits are looked up per GraphQL request. Each repo
+# can return up to 100 commits on each of up to 100 branches, so this is kept
+# well under GitHub's limit of 500,000 results per request.
+REPO_BATCH_SIZE = 10
+# The commits a user made on each of a repo's branches, as requested for
+# every repo in getRepoCommitsBatch.
+REPO_COMMITS_FIELDS = """
+    refs(refPrefix: "refs/heads/", first: 100) {
+        pageInfo { hasNextPage }
+        nodes {
+            name
+            target {
+                ... on Commit {
+                    history(first: 100, author: {id: $userId}) {
+                        totalCount
+                        pageInfo { hasNextPage endCursor }
+                        nodes { oid authoredDate }
+                    }
+                }
+            }
+        }
+    }"""
+
+# Where search results are cached on disk between runs when requests-cache is
+# installed, and how many seconds a cached result is used before it is checked
+# with GitHub again. GitHub's own Cache-Control headers take priority.
+DISK_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'githubSearch_cache.sqlite')
+DISK_CACHE_EXPIRE_AFTER = 600
+
+def createSession(useDiskCache=False):
+    # Returns a session set up for the GitHub API. Connections to
+    # api.github.com are kept alive and reused instead of doing a new TLS
+    # handshake for each request, and transient server errors are retried
+    # with backoff before being reported. If useDiskCache is set and
+    # requests-cache is installed, responses are also cached on disk.
+    if useDiskCache and requests_cache:
+        # GraphQL queries are sent as POSTs, which are cached by their query
+        # and variables like any other request.
+        session = requests_cache.CachedSession(DISK_CACHE_PATH, backend='sqlite',
+                                               expire_after=DISK_CACHE_EXPIRE_AFTER,
+                                               allowable_codes=(200,),
+                                               allowable_methods=('GET', 'HEAD', 'POST'),
+                                               filter_fn=isCacheableResponse,
+                                               cache_control=True)
+    else:
+        session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=CONNECTION_POOL_SIZE,
+                                          max_retries=Retry(total=3, backoff_factor=0.5,
+                                                            status_forcelist=[502, 503, 504],
+                                                            respect_retry_after_header=True,
+                                                            raise_on_status=False)))
+    session.headers.update({'Accept': 'application/vnd.github+json'})
+    if GITHUB_TOKEN:
+        session.headers.update({'Authorization': f"token {GITHUB_TOKEN}"})
+    return session
+
+def isCacheableResponse(r):
+    # GraphQL reports failures such as hitting a rate limit with a 200 status
+    # and an 'errors' list, so those responses are kept out of the disk cache.
+    if r.request.method == 'POST':
+        return b'"errors"' not in r.content
+    return True
+
+# One session is shared by every query. The disk cache is only turned on when
+# the application is started (see Startup), so importing this file never
+# creates a cache file.
+SESSION = createSession()
+
+# Names GitHub reserves, and the longest a user/organization name can be.
+PROTECTED_NAMES = frozenset(['help', 'about', 'pricing'])
+MAX_NAME_LENGTH = 39
+
 #################################### Model #####################################
 
+class RepoStats:
+    # The number of commits a user made to a repo and the date of the last one.
+    # A repo search can return hundreds of these, so __slots__ keeps each one
+    # much smaller than the equivalent dictionary.
+    __slots__ = ('totalCommits', 'lastCommit')
+
+    def __init__(self, totalCommits=0, lastCommit=None):
+        self.totalCommits = totalCommits
+        self.lastCommit = lastCommit
+
+    def __repr__(self):
+        return f"RepoStats(totalCommits={self.totalCommits}, lastCommit={self.lastCommit!r})"
+
+class CommitSummary:
+    # The shas of the commits a user made to a repo, and the date of the latest
+    # one as the string GitHub sent. Dates all have the same UTC format, so
+    # they sort in date order and are reduced to the latest as commits are
+    # added; only the shas are held, so commits on several branches are
+    # counted once.
+    __slots__ = ('shas', 'latestDate')
+
+    def __init__(self):
+        self.shas = set()
+        self.latestDate = None
+
+    def add(self, sha, commitDate):
+        self.shas.add(sha)
+        if commitDate and (self.latestDate is None or commitDate > self.latestDate):
+            self.latestDate = commitDate
+
+    def update(self, other):
+        # Adds the commits of another CommitSummary, such as another branch's.
+        self.shas |= other.shas
+        if other.latestDate and (self.latestDate is None or other.latestDate > self.latestDate):
+            self.latestDate = other.latestDate
+
+class ExpiringCache:
+    # A thread safe cache that holds up to maxSize entries, dropping the least
+    # recently used entry when full, and forgets entries ttl seconds after
+    # they were stored.
+
+    def __init__(self, maxSize, ttl):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        # Returns the value stored for key, or None if there is none or it has expired.
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            storedAt, value = entry
+            if time.monotonic() - storedAt > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+userInfoCache = ExpiringCache(USER_INFO_CACHE_SIZE, USER_INFO_CACHE_TTL)
+# GraphQL node ids of users, noted whenever a user is looked up so that
+# getUserId does not have to ask GitHub for them separately.
+userIdCache = ExpiringCache(USER_INFO_CACHE_SIZE, USER_INFO_CACHE_TTL)
+orgMembersCache = ExpiringCache(ORG_MEMBERS_CACHE_SIZE, ORG_MEMBERS_CACHE_TTL)
+
+def clearCaches():
+    # Forgets every user and organization looked up so far, along with the
+    # responses cached on disk, so the next search asks GitHub again.
+    userInfoCache.clear()
+    userIdCache.clear()
+    orgMembersCache.clear()
+    if requests_cache and isinstance(SESSION, requests_cache.CachedSession):
+        SESSION.cache.clear()
+
 def checkInput(input):
     # Only alphanumeric characters or single hyphens are allowed.
     # Cannot start or end with a hyphen.
     # Can only be 39 characters long.
-    if input in ['help', 'about', 'pricing']:
-        return ValueError("Input is a protected GitHub name. Please try a different name.")
-    validInputRegex = '^[a-zA-Z\d](?:[a-zA-Z\d]|-(?=[a-zA-Z\d])){0,38}$'
-    if not re.match(validInputRegex, input):
+    # GitHub names are not case sensitive. These plain string checks do the
+    # same as matching r'[a-zA-Z\d](?:[a-zA-Z\d]|-(?=[a-zA-Z\d])){0,38}'
+    # but without running a regex; isascii keeps out non-English letters and
+    # digits, which isalnum would accept.
+    if input.lower() in PROTECTED_NAMES:
+        raise ValueError("Input is a protected GitHub name. Please try a different name.")
+    if (not input or len(input) > MAX_NAME_LENGTH or input[0] == '-' or input[-1] == '-'
+            or '--' in input or not input.isascii() or not input.replace('-', '').isalnum()):
         raise ValueError("Input is invalid. Valid inputs can contain only "
                          "alphanumeric characters and single hyphens and cannot "
                          "be over 39 characters long.")
@@ -64,62 +322,92 @@ def getOrgMembers(orgName):
     #check input
     checkInput(orgName)
 
-    authToken = os.getenv('GITHUB_TOKEN')
-    headers = {'Authorization': f'token {authToken}'}
+    cachedMembers = orgMembersCache.get(orgName.lower())
+    if cachedMembers is not None:
+        return [dict(member) for member in cachedMembers], []
 
     members = []
     errors = []
 
-    #This query to verify the existence of the Organization is technically not required.
-    queryUrl = f"https://api.github.com/orgs/{orgName}"
-    r = requests.get(queryUrl, headers=headers)
-    if r.status_code != 200:
-        message = f"Organization '{orgName}' not found."
-        if r.status_code >= 400 and r.status_code < 500:
-            message += f" Please check that it was spelled correctly.\n{r.text}"
-        else:
-            message += f" Returned error code {r.status_code}. {r.text}"
-        raise ValueError(message)
-    orgResult = r.json()
-    # pprint(orgResult)
-
     #End url with 'members' if all members are desired.
-    r2 = requests.get(f'https://api.github.com/orgs/{orgName}/public_members', headers=headers)
+    # This also verifies the Organization exists, as GitHub returns a 404 here
+    # for unknown names, so no separate lookup of the Organization is needed.
+    memberParams = {"per_page": 100}
+    r2 = apiGet(f'https://api.github.com/orgs/{orgName}/public_members',
+                params=memberParams)
     if r2.status_code != 200:
-        message = f"Members for organization '{orgName}' not found."
-        if r2.status_code >= 400 and r.status_code < 500:
+        message = f"Organization '{orgName}' not found."
+        if r2.status_code >= 400 and r2.status_code < 500:
             message += f" Please check that it was spelled correctly.\n{r2.text}"
         else:
             message += f" Returned error code {r2.status_code}. {r2.text}"
         raise ValueError(message)
-    orgMembersResult = r2.json()
-    while 'next' in r2.links.keys():
-        r2=requests.get(r2.links['next']['url'],headers=headers)
-        if r2.status_code != 200:
-            message = f"Further member search pages for organization '{rep.get('name')}' not found."
-            message += f"\nReturned error code {r2.status_code}. {r2.text}"
-            errors.append(ValueError(message))
-            break
-        orgMembersResult.extend(r2.json())
+    # Only the login of each member is kept from the member listing; the rest
+    # of the details are looked up below.
+    logins = []
+    try:
+        for page in followPages(r2):
+            logins.extend(member.get('login') for member in page)
+    except ValueError as e:
+        message = f"Further member search pages for organization '{orgName}' not found."
+        message += f"\n{e}"
+        errors.append(ValueError(message))
+
+    # Member details are looked up in batches through the GraphQL API, with the
+    # batches run concurrently. Any batch the GraphQL API could not serve falls
+    # back to one REST request per member.
+    batches = [logins[i:i + GRAPHQL_BATCH_SIZE]
+               for i in range(0, len(logins), GRAPHQL_BATCH_SIZE)]
+    failedLogins = []
+    batchResults = list(EXECUTOR.map(lambda batch: safeCall(getUserInfoBatch, batch),
+                                     batches))
+    for batch, (batchResult, e) in zip(batches, batchResults):
+        if e is not None:
+            failedLogins.extend(batch)
+            continue
+        batchMembers, batchErrors = batchResult
+        members.extend(batchMembers)
+        errors.extend(batchErrors)
 
-    for member in orgMembersResult:
-        try:
-            members.append(getUserInfo(member.get('login')))
-        except Exception as e:
+    results = EXECUTOR.map(lambda login: safeCall(fetchUserInfo, login), failedLogins)
+    for userDict, e in results:
+        if e is not None:
             errors.append(e)
+        else:
+            members.append(userDict)
+
+    # Only complete member lists are cached, so a failed lookup is retried
+    # the next time the organization is searched.
+    if not errors:
+        orgMembersCache.set(orgName.lower(), [dict(member) for member in members])
 
     return members, errors
 
+def safeCall(func, *args):
+    # Runs func with the given arguments, capturing any exception instead of
+    # raising it so that one failure does not stop the rest of a batch.
+    # Returns a tuple of (result, None) on success or (None, exception) on failure.
+    try:
+        return func(*args), None
+    except Exception as e:
+        return None, e
+
 def getUserInfo(username):
     # Returns a dictionary containing the username, real name, and email (if it exists)
     # Ex. {'Username': <username>, 'Real Name': <actual name>, 'Email': None}
     checkInput(username)
+    return fetchUserInfo(username)
+
+def fetchUserInfo(username):
+    # Looks up a user as getUserInfo does, without checking the username.
+    # Used for logins that came from GitHub itself, which are valid already;
+    # some older accounts even have logins that checkInput would turn away.
+    userDict = getCachedUserInfo(username)
+    if userDict:
+        return userDict
     #run username search
-    authToken = os.getenv('GITHUB_TOKEN')
-    headers = {'Authorization': f'token {authToken}'}
-
     queryUrl = f"https://api.github.com/users/{username}"
-    r = requests.get(queryUrl, headers=headers)
+    r = apiGet(queryUrl)
     if r.status_code != 200:
         message = f"User {username}' not found."
         if r.status_code >= 400 and r.status_code < 500:
@@ -127,30 +415,83 @@ def getUserInfo(username):
         else:
             message += f" Returned error code {r.status_code}. {r.text}"
         raise ValueError(message)
-    userInfo = r.json()
+    userInfo = loadJson(r.content)
     # pprint(userInfo)
     userDict = {'Username': userInfo.get('login'),
                 'Real Name': userInfo.get('name'),
                 'Email':userInfo.get('email')}
+    cacheUserInfo(username, userDict)
+    if userInfo.get('node_id'):
+        userIdCache.set(username.lower(), userInfo['node_id'])
 
     return userDict
 
+def getUserInfoBatch(usernames):
+    # Looks up several users with a single GraphQL request. Users already in
+    # the user cache are not requested again.
+    # Returns a list of dictionaries in the same format as getUserInfo, along
+    # with a list of errors for any users that could not be found.
+    # Ex. ([{'Username': <username>, 'Real Name': <actual name>, 'Email': None}], [])
+    userDicts = {username: getCachedUserInfo(username) for username in usernames}
+    uncached = [username for username in usernames if not userDicts[username]]
+
+    if uncached:
+        variableDefs = ', '.join(f'$login{i}: String!' for i in range(len(uncached)))
+        userFields = ' '.join(f'user{i}: user(login: $login{i}) {{ id login name email }}'
+                              for i in range(len(uncached)))
+        query = f"query({variableDefs}) {{ {userFields} }}"
+        variables = {f'login{i}': username for i, username in enumerate(uncached)}
+        result = runGraphQLQuery(query, variables)
+        data = result.get('data')
+        if not data:
+            message = "User search failed."
+            message += f" Returned errors {result.get('errors')}"
+            raise ValueError(message)
+
+        for i, username in enumerate(uncached):
+            userInfo = data.get(f'user{i}')
+            if not userInfo:
+                continue
+            # GraphQL reports a missing email as an empty string rather than null.
+            userDicts[username] = {'Username': userInfo.get('login'),
+                                   'Real Name': userInfo.get('name'),
+                                   'Email': userInfo.get('email') or None}
+            cacheUserInfo(username, userDicts[username])
+            userIdCache.set(username.lower(), userInfo.get('id'))
+
+    users = []
+    errors = []
+    for username in usernames:
+        if userDicts[username]:
+            users.append(userDicts[username])
+        else:
+            errors.append(ValueError(f"User '{username}' not found."))
+
+    return users, errors
+
+def getCachedUserInfo(username):
+    # Returns a copy of the cached details for username, or None if the user
+    # has not been looked up recently.
+    userDict = userInfoCache.get(username.lower())
+    return dict(userDict) if userDict is not None else None
+
+def cacheUserInfo(username, userDict):
+    # Stores a copy of a user's details so later lookups can skip GitHub.
+    userInfoCache.set(username.lower(), dict(userDict))
+
 def getReposForUser(username):
     # Parse for repos user has made at least one commit to.
-    # Returns dictionary with full repo names as keys with a dictionary
+    # Returns dictionary with full repo names as keys with a RepoStats
     # containing the number of commits and date of last commit of specified user.
-    # ex. {<repoName>: {{'Total Commits':totalCommits, 'Last Commit':latestDate}}}
+    # ex. {<repoName>: RepoStats(totalCommits=<totalCommits>, lastCommit=<latestDate>)}
 
     checkInput(username)
 
     repoDict = {}
 
-    authToken = os.getenv('GITHUB_TOKEN')
-    headers = {'Authorization': f'token {authToken}'}
-
     repoQueryUrl = f"https://api.github.com/users/{username}/repos"
-    repoParams = {"type": "all"}
-    r = requests.get(repoQueryUrl, headers=headers, params=repoParams)
+    repoParams = {"type": "all", "per_page": 100}
+    r = apiGet(repoQueryUrl, params=repoParams)
     if r.status_code != 200:
         message = f"Repos for user '{username}' not found."
         if r.status_code >= 400 and r.status_code < 500:
@@ -158,120 +499,545 @@ def getReposForUser(username):
         else:
             message += f" Returned error code{r.status_code}. {r.text}"
         raise ValueError(message)
-    repos = r.json()
-
     errors = []
 
-    for rep in repos:
+    # Each repo in the listing comes with around a hundred fields, so only the
+    # few used below are kept as each page arrives.
+    repos = []
+    try:
+        for page in followPages(r):
+            repos.extend({'name': rep.get('name'),
+                          'full_name': rep.get('full_name'),
+                          'owner': {'login': (rep.get('owner') or {}).get('login')}}
+                         for rep in page)
+    except ValueError as e:
+        message = f"Further repo search pages for user '{username}' not found."
+        message += f"\n{e}"
+        errors.append(ValueError(message))
+
+    # The user's commits on every branch of several repos at a time are looked
+    # up through the GraphQL API, with the batches run concurrently. Branches
+    # whose commits did not all fit are continued through the GraphQL API from
+    # where the batch left off. Repos the GraphQL API could not serve are
+    # searched branch by branch through the REST API instead.
+    batchResults = [None] * len(repos)
+    try:
+        userId = getUserId(username)
+    except ValueError:
+        userId = None
+    if userId:
+        batches = [repos[i:i + REPO_BATCH_SIZE]
+                   for i in range(0, len(repos), REPO_BATCH_SIZE)]
+        results = EXECUTOR.map(lambda batch: safeCall(getRepoCommitsBatch, batch, userId),
+                               batches)
+        batchResults = []
+        for batch, (batchResult, e) in zip(batches, results):
+            batchResults.extend(batchResult if e is None else [None] * len(batch))
+
+    # Everything the GraphQL API did not cover is then fetched through the REST
+    # API for all repos at once rather than one repo at a time: first the
+    # branch listings of repos GraphQL could not serve, then the commits of
+    # every branch still needed. Commits reachable from several branches show
+    # up once per branch, so each repo's commits are merged by sha to only
+    # count them once. Repos with a single branch have no commits to merge,
+    # so GitHub's count of their commits is used instead of listing them all.
+    repoCommits = {}
+    repoCommitCounts = {}
+    repoBranchNames = {}
+    repoBranchCursors = {}
+    branchListings = {}
+    for i, (rep, batchResult) in enumerate(zip(repos, batchResults)):
         # print(rep.get('full_name'))
         # pprint(rep)
-        #Counts for commits across all of the repos branches
-        numberOfCommits = 0
-        latestDate = 0
-        try:
-            repoOwner = rep['owner']['login']
-        except Exception as e:
-            errors.append(e)
+        if not rep['owner']['login']:
+            errors.append(ValueError(f"Owner of repo '{rep.get('full_name')}' not found."))
             continue
+        if batchResult is None:
+            repoCommits[i] = CommitSummary()
+            branchListings[i] = EXECUTOR.submit(getBranchNames, rep['owner']['login'],
+                                                rep.get('name'))
+        elif batchResult[2] is not None:
+            commits, _, numberOfCommits = batchResult
+            repoCommitCounts[i] = (numberOfCommits, commits.latestDate)
+        else:
+            repoCommits[i], repoBranchCursors[i], _ = batchResult
+    for i, listing in branchListings.items():
+        repoBranchNames[i], branchErrors = listing.result()
+        errors.extend(branchErrors)
+
+    commitFutures = {}
+    countFutures = {}
+    for i, branchNames in repoBranchNames.items():
+        rep = repos[i]
+        if len(branchNames) == 1:
+            del repoCommits[i]
+            future = EXECUTOR.submit(countCommitsForBranch, rep['owner']['login'],
+                                     rep.get('name'), branchNames[0], username)
+            countFutures[future] = i
+            continue
+        for branchName in branchNames:
+            future = EXECUTOR.submit(fetchCommitsForBranch, rep['owner']['login'],
+                                     rep.get('name'), branchName, username)
+            commitFutures[future] = i
+    for i, branchCursors in repoBranchCursors.items():
+        rep = repos[i]
+        for branchName, cursor in branchCursors.items():
+            future = EXECUTOR.submit(fetchBranchHistory, rep['owner']['login'],
+                                     rep.get('name'), branchName, userId, cursor)
+            commitFutures[future] = i
+    for future in as_completed(commitFutures):
+        commits, branchErrors = future.result()
+        errors.extend(branchErrors)
+        repoCommits[commitFutures[future]].update(commits)
+    for future, i in countFutures.items():
+        repoCommitCounts[i], branchErrors = future.result()
+        errors.extend(branchErrors)
+
+    # Only the latest date of each repo is parsed.
+    for i, commits in repoCommits.items():
+        repoCommitCounts[i] = (len(commits.shas), commits.latestDate)
+
+    for i in sorted(repoCommitCounts):
+        numberOfCommits, latestDate = repoCommitCounts[i]
+        if latestDate:
+            try:
+                latestDate = parseGitHubDate(latestDate)
+            except ValueError as e:
+                errors.append(e)
+                latestDate = None
 
-        branchQueryUrl = f"https://api.github.com/repos/{repoOwner}/{rep.get('name')}/branches"
-        branchParams = {
-            "per_page": 100,
-            "page": 1
-        }
-        r2 = requests.get(branchQueryUrl, headers=headers, params=branchParams)
-        if r2.status_code != 200:
-            message = f"Branches for repo '{rep.get('name')}' not found."
-            message += f" Returned error code {r2.status_code}. {r2.text}"
-            errors.append(ValueError(message))
-            break
-        branches = r2.json()
-        while 'next' in r2.links.keys():
-            r2=requests.get(r2.links['next']['url'],headers=headers)
-            if r2.status_code != 200:
-                message = f"Further branch search pages for repo '{rep.get('name')}' not found."
-                message += f"\nReturned error code {r2.status_code}. {r2.text}"
-                errors.append(ValueError(message))
-                break
-            branches.extend(r2.json())
-
-        for branch in branches:
-            # Finding the commits for each branch
-            commitQueryUrl = f"https://api.github.com/repos/{repoOwner}/{rep.get('name')}/commits"
-            commitParams = {
-                "author": username,
-                "per_page": 100,
-                "page": 1,
-                "sha": branch['name']
-            }
-            r3 = requests.get(commitQueryUrl, headers=headers, params=commitParams)
-            if r3.status_code != 200:
-                message = f"Commits for branch '{branch.get('name')}' not found."
-                message += f" Returned error code {r3.status_code}. {r3.text}"
-                errors.append(ValueError(message))
-            commits = r3.json()
-            # pprint(commits)
-            while 'next' in r3.links.keys():
-                r3=requests.get(r3.links['next']['url'],headers=headers)
-                if r3.status_code != 200:
-                    message = f"Further commit search pages for branch '{branch.get('name')}' not found."
-                    message += f"\nReturned error code {r3.status_code}. {r3.text}"
-                    errors.append(ValueError(message))
-                    break
-                commits.extend(r3.json())
-            # pprint(commits)
-            for commit in commits:
-                #check if commits exist
-                try:
-                    if commits.get('message') == 'Git Repository is empty.':
-                        continue
-                except:
-                    pass
-                # pprint(commit)
-
-                #check to make sure it belongs to the author and check the time
-                try:
-                    committerUsername = commit['author']['login']
-                except TypeError as e:
-                    #probably not a real commit/not one attached to a person. Ignore.
-                    errors.append(e)
-                    # pprint(commit)
-                    # pprint(commits)
-                    continue
-                if committerUsername == username:
-                    numberOfCommits += 1
-                    try:
-                        dateString = commit['commit']['author']['date']
-                        # print(dateString) #datestring I'm getting is several hours off
-                        # of what GitHub says sometimes. Possibly due to timezone
-                        # difference between user and the GitHub server.
-                        commitDate = datetime.strptime(dateString,
-                                                       "%Y-%m-%dT%H:%M:%SZ")
-                        if not latestDate:
-                            latestDate = commitDate
-                        elif commitDate > latestDate:
-                            latestDate = commitDate
-                    except Exception as e:
-                        errors.append(e)
-
-            # pprint(commits)
         # At least one commit from the user was in the repo
         if numberOfCommits:
             #full name listed instead of just name, in case there are multiple
             # of the same name repo
-            repoDict[rep.get('full_name')] = {'Total Commits':numberOfCommits,
-                                          'Last Commit':latestDate}
+            repoDict[repos[i].get('full_name')] = RepoStats(numberOfCommits, latestDate)
 
     return repoDict, errors
 
-def strUserInfo(userDict, fill=45):
-    line = ""
-    line += f"{userDict.get('Username'): <{fill}}" if userDict.get('Username') else f"{'': <{fill}}"
-    line += f" {userDict.get('Real Name'): <{fill}}" if userDict.get('Real Name') else f"{'': <{fill}}"
+def getUserId(username):
+    # Returns the GraphQL node id of a user, which GraphQL uses to filter
+    # commit history by author. Users already looked up by getUserInfo or
+    # getUserInfoBatch are not requested again.
+    userId = userIdCache.get(username.lower())
+    if userId:
+        return userId
+    query = "query($login: String!) { user(login: $login) { id } }"
+    result = runGraphQLQuery(query, {'login': username})
+    user = (result.get('data') or {}).get('user')
+    if not user:
+        message = f"User '{username}' not found."
+        message += f" Returned errors {result.get('errors')}"
+        raise ValueError(message)
+    userIdCache.set(username.lower(), user['id'])
+    return user['id']
+
+def getRepoCommitsBatch(repos, userId):
+    # Looks up the commits the user made on every branch of several repos with
+    # a single GraphQL request.
+    # Returns a list with an entry for each repo: a tuple of a CommitSummary
+    # of the commits found (as returned by fetchCommitsForBranch), a
+    # dictionary of the branches whose commits did not all fit in the response,
+    # with the cursor to continue each from, and the user's total number of
+    # commits if the repo has a single branch (None otherwise). A single
+    # branch's commits never need to be continued, since its count is known.
+    # The entry is None if the repo could not be looked up or has too many
+    # branches to fit.
+    # Ex. [(CommitSummary, {<branchName>: <cursor>}, None), None]
+    variableDefs = ['$userId: ID!']
+    repoFields = []
+    variables = {'userId': userId}
+    for i, rep in enumerate(repos):
+        variableDefs.append(f'$owner{i}: String!, $name{i}: String!')
+        repoFields.append(f'repo{i}: repository(owner: $owner{i}, name: $name{i}) {{'
+                          f' {REPO_COMMITS_FIELDS} }}')
+        variables[f'owner{i}'] = rep['owner']['login']
+        variables[f'name{i}'] = rep.get('name')
+    query = f"query({', '.join(variableDefs)}) {{ {' '.join(repoFields)} }}"
+    result = runGraphQLQuery(query, variables)
+    data = result.get('data')
+    if not data:
+        message = "Repo search failed."
+        message += f" Returned errors {result.get('errors')}"
+        raise ValueError(message)
 
-    if userDict.get('Email'):
-        line +=f" {userDict.get('Email')}"
-    return line
+    repoResults = []
+    for i in range(len(repos)):
+        repoInfo = data.get(f'repo{i}')
+        if not repoInfo or repoInfo['refs']['pageInfo']['hasNextPage']:
+            repoResults.append(None)
+            continue
+        commits = CommitSummary()
+        unfinishedBranches = {}
+        branches = repoInfo['refs']['nodes']
+        if len(branches) == 1:
+            history = (branches[0].get('target') or {}).get('history')
+            if history:
+                addHistoryCommits(commits, history)
+            repoResults.append((commits, unfinishedBranches,
+                                history['totalCount'] if history else 0))
+            continue
+        for branch in branches:
+            history = (branch.get('target') or {}).get('history')
+            if not history:
+                continue
+            if history['pageInfo']['hasNextPage']:
+                unfinishedBranches[branch['name']] = history['pageInfo']['endCursor']
+            addHistoryCommits(commits, history)
+        repoResults.append((commits, unfinishedBranches, None))
+
+    return repoResults
+
+def fetchBranchHistory(repoOwner, repoName, branchName, userId, cursor=None):
+    # Returns a CommitSummary of the commits the user made on a branch through
+    # the GraphQL API, starting after cursor, as fetchCommitsForBranch does.
+    # Used for branches with more commits than getRepoCommitsBatch fetches.
+    query = """
+        query($owner: String!, $name: String!, $branch: String!, $userId: ID!, $cursor: String) {
+            repository(owner: $owner, name: $name) {
+                ref(qualifiedName: $branch) {
+                    target {
+                        ... on Commit {
+                            history(first: 100, after: $cursor, author: {id: $userId}) {
+                                pageInfo { hasNextPage endCursor }
+                                nodes { oid authoredDate }
+                            }
+                        }
+                    }
+                }
+            }
+        }"""
+    commits = CommitSummary()
+    errors = []
+    variables = {'owner': repoOwner, 'name': repoName,
+                 'branch': f"refs/heads/{branchName}", 'userId': userId}
+    while True:
+        variables['cursor'] = cursor
+        try:
+            result = runGraphQLQuery(query, variables)
+        except ValueError as e:
+            message = f"Further commit search pages for branch '{branchName}' not found."
+            message += f"\n{e}"
+            errors.append(ValueError(message))
+            break
+        repository = (result.get('data') or {}).get('repository') or {}
+        history = ((repository.get('ref') or {}).get('target') or {}).get('history')
+        if not history:
+            message = f"Further commit search pages for branch '{branchName}' not found."
+            message += f" Returned errors {result.get('errors')}"
+            errors.append(ValueError(message))
+            break
+        addHistoryCommits(commits, history)
+        if not history['pageInfo']['hasNextPage']:
+            break
+        cursor = history['pageInfo']['endCursor']
+
+    return commits, errors
+
+def addHistoryCommits(commits, history):
+    # Adds each commit in a page of GraphQL commit history to the CommitSummary commits.
+    for commit in history['nodes']:
+        commits.add(commit['oid'], commit.get('authoredDate'))
+
+def getBranchNames(repoOwner, repoName):
+    # Returns a list of the names of every branch in a repo, along with a list
+    # of any errors hit while paging through them.
+    # Ex. (['main', 'dev'], [])
+    branchNames = []
+    errors = []
+    branchQueryUrl = f"https://api.github.com/repos/{repoOwner}/{repoName}/branches"
+    branchParams = {
+        "per_page": 100,
+        "page": 1
+    }
+    try:
+        for branches in paginate(branchQueryUrl, branchParams):
+            branchNames.extend(branch.get('name') for branch in branches)
+    except ValueError as e:
+        if branchNames:
+            message = f"Further branch search pages for repo '{repoName}' not found."
+            message += f"\n{e}"
+        else:
+            message = f"Branches for repo '{repoName}' not found. {e}"
+        errors.append(ValueError(message))
+
+    return branchNames, errors
+
+def fetchCommitsForBranch(repoOwner, repoName, branchName, username):
+    # Returns a CommitSummary of every commit on the given branch authored by
+    # username, along with a list of any errors hit while paging through them.
+    # Each page is reduced as it arrives so the full commit results are never
+    # all held.
+    # Ex. (CommitSummary, [])
+    branchCommits = CommitSummary()
+    errors = []
+    commitQueryUrl = f"https://api.github.com/repos/{repoOwner}/{repoName}/commits"
+    commitParams = {
+        "author": username,
+        "per_page": 100,
+        "page": 1,
+        "sha": branchName
+    }
+    pagesRead = 0
+    try:
+        for commits in paginate(commitQueryUrl, commitParams):
+            pagesRead += 1
+            # GitHub only returns commits by the user asked for in the
+            # 'author' parameter, so they are not checked again here. Checking
+            # the login also dropped every commit when the username was typed
+            # in a different case than the account's login.
+            for commit in commits:
+                commitAuthor = (commit.get('commit') or {}).get('author') or {}
+                branchCommits.add(commit.get('sha'), commitAuthor.get('date'))
+    except ValueError as e:
+        if pagesRead:
+            message = f"Further commit search pages for branch '{branchName}' not found."
+            message += f"\n{e}"
+        else:
+            # An empty repository also lands here ('Git Repository is empty.').
+            message = f"Commits for branch '{branchName}' not found. {e}"
+        errors.append(ValueError(message))
+
+    return branchCommits, errors
+
+def countCommitsForBranch(repoOwner, repoName, branchName, username):
+    # Returns the number of commits on the given branch authored by username
+    # and the date of the newest one, as the string GitHub sent, along with a
+    # list of any errors. Commits are asked for one per page, so the page
+    # number of the 'last' link GitHub returns is the number of commits and
+    # only the newest commit is downloaded.
+    # Ex. ((<numberOfCommits>, <commitDate>), [])
+    commitQueryUrl = f"https://api.github.com/repos/{repoOwner}/{repoName}/commits"
+    commitParams = {
+        "author": username,
+        "per_page": 1,
+        "sha": branchName
+    }
+    try:
+        r = apiGet(commitQueryUrl, params=commitParams)
+        if r.status_code != 200:
+            raise ValueError(f"Returned error code {r.status_code}. {r.text}")
+    except ValueError as e:
+        # An empty repository also lands here ('Git Repository is empty.').
+        return (0, None), [ValueError(f"Commits for branch '{branchName}' not found. {e}")]
+    commits = loadJson(r.content)
+    if not commits:
+        return (0, None), []
+
+    numberOfCommits = 1
+    if 'last' in r.links:
+        lastQuery = dict(parse_qsl(urlsplit(r.links['last']['url']).query))
+        try:
+            numberOfCommits = int(lastQuery['page'])
+        except (KeyError, ValueError):
+            message = f"Number of commits for branch '{branchName}' not found."
+            return (0, None), [ValueError(message)]
+    commitAuthor = (commits[0].get('commit') or {}).get('author') or {}
+    return (numberOfCommits, commitAuthor.get('date')), []
+
+def parseGitHubDate(dateString):
+    # print(dateString) #datestring I'm getting is several hours off
+    # of what GitHub says sometimes. Possibly due to timezone
+    # difference between user and the GitHub server.
+    # GitHub sends dates in UTC as 'YYYY-MM-DDTHH:MM:SSZ'.
+    # Dropping the 'Z' lets the much faster fromisoformat
+    # give the same naive datetime strptime would.
+    return datetime.fromisoformat(dateString[:-1])
+
+def paginate(url, params=None):
+    # Yields the decoded results of each page of a GitHub query.
+    # See followPages.
+    return followPages(apiGet(url, params=params))
+
+def followPages(r):
+    # Yields the decoded results of the page in response r and of every page
+    # after it, until the last page.
+    # When GitHub's links give the number of the last page, the urls of every
+    # page are known up front, so up to PAGE_PREFETCH_COUNT pages are requested
+    # at once in the background and yielded in order as they arrive. Otherwise
+    # the 'next' links are followed, with the next page requested in the
+    # background as soon as its link is known.
+    # Raises a ValueError if a page could not be retrieved.
+    if r.status_code != 200:
+        raise ValueError(f"Returned error code {r.status_code}. {r.text}")
+    pageUrls = getRemainingPageUrls(r)
+    if pageUrls is None:
+        while True:
+            if r.status_code != 200:
+                raise ValueError(f"Returned error code {r.status_code}. {r.text}")
+            nextPage = None
+            if 'next' in r.links:
+                nextPage = PREFETCH_EXECUTOR.submit(apiGet, r.links['next']['url'])
+            yield loadJson(r.content)
+            if nextPage is None:
+                return
+            r = nextPage.result()
+
+    pageUrls = iter(pageUrls)
+    pendingPages = deque(PREFETCH_EXECUTOR.submit(apiGet, url)
+                         for url in islice(pageUrls, PAGE_PREFETCH_COUNT))
+    yield loadJson(r.content)
+    while pendingPages:
+        r = pendingPages.popleft().result()
+        if r.status_code != 200:
+            for page in pendingPages:
+                page.cancel()
+            raise ValueError(f"Returned error code {r.status_code}. {r.text}")
+        for url in islice(pageUrls, 1):
+            pendingPages.append(PREFETCH_EXECUTOR.submit(apiGet, url))
+        yield loadJson(r.content)
+
+def getRemainingPageUrls(r):
+    # Returns a list of the urls of the pages after the one in response r, up
+    # to the last page, built from the 'next' and 'last' links GitHub returns.
+    # Returns None if the links do not give page numbers.
+    if 'next' not in r.links:
+        return []
+    if 'last' not in r.links:
+        return None
+    nextUrl = urlsplit(r.links['next']['url'])
+    nextQuery = parse_qsl(nextUrl.query)
+    try:
+        firstPage = int(dict(nextQuery)['page'])
+        lastPage = int(dict(parse_qsl(urlsplit(r.links['last']['url']).query))['page'])
+    except (KeyError, ValueError):
+        return None
+    otherParams = [(key, value) for key, value in nextQuery if key != 'page']
+    return [urlunsplit(nextUrl._replace(query=urlencode(otherParams + [('page', page)])))
+            for page in range(firstPage, lastPage + 1)]
+
+def apiGet(url, params=None):
+    # Sends a GET request to the GitHub API. See apiRequest.
+    # The last successful response for each url is kept along with its ETag,
+    # which is sent back to GitHub when the url is requested again. If nothing
+    # has changed GitHub answers 304 Not Modified with no body, which does not
+    # count against the rate limit, and the kept response is returned instead.
+    global etagCacheBytes
+    fullUrl = requests.Request('GET', url, params=params).prepare().url
+    with etagCacheLock:
+        cached = etagCache.get(fullUrl)
+    headers = {'If-None-Match': cached.headers['ETag']} if cached is not None else None
+    r = apiRequest('GET', fullUrl, headers=headers)
+    if r.status_code == 304 and cached is not None:
+        r = cached
+    elif r.status_code != 200 or not r.headers.get('ETag'):
+        return r
+    with etagCacheLock:
+        previous = etagCache.pop(fullUrl, None)
+        if previous is not None:
+            etagCacheBytes -= len(previous.content)
+        etagCache[fullUrl] = r
+        etagCacheBytes += len(r.content)
+        while etagCacheBytes > ETAG_CACHE_BYTES and len(etagCache) > 1:
+            _, evicted = etagCache.popitem(last=False)
+            etagCacheBytes -= len(evicted.content)
+    return r
+
+def apiRequest(method, url, **kwargs):
+    # Sends a request through SESSION. When GitHub answers that a rate limit
+    # was hit, waits for the limit to clear and tries again, up to
+    # RATE_LIMIT_RETRIES times. If the limit would take longer than
+    # MAX_RATE_LIMIT_WAIT seconds to clear, the rate limited response is
+    # returned straight away so it can be reported. While a wait is underway
+    # every other request to the same API waits too (see pauseRequests).
+    # No more than MAX_WORKERS requests are sent at once from any thread.
+    # Raises a ValueError if GitHub could not be reached or did not answer
+    # within REQUEST_TIMEOUT seconds, after the retries set up in createSession.
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    resource = 'graphql' if url == GRAPHQL_URL else 'core'
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        waitForRequests(resource)
+        with REQUEST_SLOTS:
+            if closing.is_set():
+                raise ValueError(f"Request to '{url}' cancelled. The application is closing.")
+            try:
+                r = SESSION.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                raise ValueError(f"Request to '{url}' failed. {e}")
+        wait = rateLimitWait(r)
+        if wait is None:
+            wait = lowRateLimitWait(r)
+            if wait is not None and wait <= MAX_RATE_LIMIT_WAIT:
+                pauseRequests(resource, wait)
+            return r
+        if wait > MAX_RATE_LIMIT_WAIT or attempt == RATE_LIMIT_RETRIES:
+            return r
+        pauseRequests(resource, wait)
+
+def waitForRequests(resource):
+    # Sleeps while requests to the given API ('core' or 'graphql') are paused,
+    # or until the application starts closing.
+    with rateLimitLock:
+        delay = rateLimitResumeTimes.get(resource, 0) - time.time()
+    if delay > 0:
+        closing.wait(delay)
+
+def cancelRequests():
+    # Makes every request not yet sent give up, so the application can exit
+    # without waiting for a search that is still queued.
+    closing.set()
+
+def pauseRequests(resource, wait):
+    # Holds back every request to the given API for the next wait seconds, so
+    # other threads do not keep running into a rate limit.
+    with rateLimitLock:
+        rateLimitResumeTimes[resource] = max(rateLimitResumeTimes.get(resource, 0),
+                                             time.time() + wait)
+
+def rateLimitWait(r):
+    # Returns the number of seconds to wait before retrying a rate limited
+    # response, or None if the response was not rate limited.
+    if r.status_code not in (403, 429):
+        return None
+    try:
+        if r.headers.get('Retry-After'):
+            return int(r.headers['Retry-After'])
+        if r.headers.get('X-RateLimit-Remaining') == '0':
+            return max(0, int(r.headers['X-RateLimit-Reset']) - time.time())
+    except (KeyError, ValueError):
+        pass
+    if 'rate limit' in r.text.lower():
+        # GitHub asks for at least a minute between retries when a secondary
+        # rate limit is hit without saying how long to wait.
+        return 60
+    return None
+
+def lowRateLimitWait(r):
+    # Returns the number of seconds until the rate limit resets if fewer than
+    # RATE_LIMIT_LOW_REMAINING requests are left, or None otherwise. Responses
+    # from the disk cache carry the rate limit of when they were stored, so
+    # they are ignored.
+    if getattr(r, 'from_cache', False):
+        return None
+    try:
+        if int(r.headers['X-RateLimit-Remaining']) >= RATE_LIMIT_LOW_REMAINING:
+            return None
+        return max(0, int(r.headers['X-RateLimit-Reset']) - time.time())
+    except (KeyError, ValueError):
+        return None
+
+def runGraphQLQuery(query, variables):
+    # Sends a query to the GitHub GraphQL API and returns the decoded response,
+    # which holds the results under 'data' and any problems under 'errors'.
+    r = apiRequest('POST', GRAPHQL_URL, json={'query': query, 'variables': variables})
+    if r.status_code != 200:
+        message = "GraphQL query failed."
+        message += f" Returned error code {r.status_code}. {r.text}"
+        raise ValueError(message)
+    return loadJson(r.content)
+
+def warmUpConnection():
+    # Opens a connection to GitHub in the background, so the TLS handshake is
+    # done while the user is still reading the prompt and typing a name
+    # rather than after they start their first search. Its rate limit
+    # headers also let apiRequest hold back if the limit is already low.
+    PREFETCH_EXECUTOR.submit(safeCall, apiRequest, 'GET', RATE_LIMIT_URL)
+
+def strUserInfo(userDict, fill=45):
+    # Built as a single f-string since it runs once per member of an organization.
+    # Missing names are left blank, keeping the email in its column.
+    email = f" {userDict.get('Email')}" if userDict.get('Email') else ""
+    return (f"{userDict.get('Username') or '': <{fill}} "
+            f"{userDict.get('Real Name') or '': <{fill}}{email}")
 
 ################################## View ########################################
 
@@ -280,11 +1046,12 @@ def strUserInfo(userDict, fill=45):
 def cmdMain(args):
     print("Welcome to this simple GitHub search.\n"
           "I hope you find what you are looking for!\n")
-    if not os.getenv('GITHUB_TOKEN'):
+    if not GITHUB_TOKEN:
         print("Authorization token not present.\nPlease make sure to add the "
               "environment variable 'GITHUB_TOKEN' with a personal access token "
               "generated at 'https://github.com/settings/tokens' as the value.")
         return
+    warmUpConnection()
 
     keepGoing = True
     fill = 40
@@ -303,6 +1070,9 @@ def cmdMain(args):
             print("(Enter '-r' to restart search)")
             orgName = str(input())
             if orgName == '-r':
+                # Restarting also forgets earlier results, so searching again
+                # gets fresh results from GitHub.
+                clearCaches()
                 continue
 
             print("This may take some time. Thank you for your patience!")
@@ -313,8 +1083,9 @@ def cmdMain(args):
                       f"{'------Real Names------': <{fill}} "
                       "------Emails------\n")
                 if mDict:
-                    for m in mDict:
-                        print(strUserInfo(m, fill))
+                    # Written all at once rather than a print per member, which
+                    # is slow for organizations with thousands of members.
+                    sys.stdout.write('\n'.join(strUserInfo(m, fill) for m in mDict) + '\n')
                     print(f"\nTotal members for organization '{orgName}': {len(mDict)}")
                 else:
                     print(f"\nNo public members for organization '{orgName}'")
@@ -330,6 +1101,9 @@ def cmdMain(args):
             username = str(input())
 
             if username == '-r':
+                # Restarting also forgets earlier results, so searching again
+                # gets fresh results from GitHub.
+                clearCaches()
                 continue
 
             print("This may take some time. Thank you for your patience!")
@@ -344,10 +1118,10 @@ def cmdMain(args):
                     print(f"{'------Repo Name------': <{fill}} "
                           f"{'---Total Commits---': <{intFill}} "
                           "-----Last Commit-----\n")
-                    for r in rDict:
-                        print(f"Repo: {r: <{fill}} "
-                              f"{rDict[r]['Total Commits']: <{intFill}} "
-                              f"{rDict[r]['Last Commit']}")
+                    sys.stdout.write(''.join(f"Repo: {r: <{fill}} "
+                                             f"{rDict[r].totalCommits: <{intFill}} "
+                                             f"{rDict[r].lastCommit}\n"
+                                             for r in rDict))
                 else:
                     print("No repos with commits found for user")
 
@@ -372,7 +1146,7 @@ def guiMain(args):
     header = Label(top, padx=20, pady=10, text="Welcome to this simple GitHub search.\n"
                                                "I hope you find what you are looking for!")
     header.pack()
-    if not os.getenv('GITHUB_TOKEN'):
+    if not GITHUB_TOKEN:
         authWarning = Message(top, width=300, justify=CENTER, bg='red',
                               text="Authorization token not present.\nPlease "
                                    "make sure to add the environment variable "
@@ -382,6 +1156,7 @@ def guiMain(args):
         authWarning.pack()
         top.mainloop()
         return
+    warmUpConnection()
 
     optionFrame = Frame(top)
     optionFrame.pack()
@@ -416,20 +1191,37 @@ def guiMain(args):
     errorScroll.config(command=errorBox.yview)
     errorBox.config(yscrollcommand=errorScroll.set)
 
+    # Searches run on a worker thread so the window keeps responding while
+    # GitHub is queried. Tk widgets may only be touched from the main thread,
+    # so the worker puts the finished text on searchResults and
+    # showSearchResults picks it up from the Tk event loop.
+    searchResults = queue.Queue()
+
     def performSearch(*argv):
+        if startButton['state'] == DISABLED:
+            # A search is already running.
+            return
         queryLabelText.set("")
         resultBox.delete("1.0", END)
         errorBox.delete("1.0", END)
         resultBox.insert(INSERT,"This may take some time. Please wait.\n"
                                 "Thank you for your patience!")
-        top.update()
+        startButton.config(state=DISABLED)
 
+        searchThread = threading.Thread(target=runSearch,
+                                        args=(searchType.get(), searchInputBox.get()),
+                                        daemon=True)
+        searchThread.start()
+        top.after(100, showSearchResults)
+
+    def runSearch(searchKind, searchName):
+        # Runs on the worker thread. Must not touch any Tk widgets.
         errorText = ""
         labelText = ""
         fill = 40
         intFill = 20
-        if searchType.get() == 'org':
-            orgName = searchInputBox.get()
+        if searchKind == 'org':
+            orgName = searchName
             labelText = f"Members for '{orgName}':\n"
             memberText = ""
             try:
@@ -451,16 +1243,14 @@ def guiMain(args):
             except Exception as err:
                 errorText = "\nCould not obtain members for organization "
                 errorText += f"'{orgName}'\n{str(err)}"
-            queryLabelText.set(labelText)
-            resultBox.delete("1.0", END)
-            resultBox.insert(INSERT, memberText)
+            searchResults.put((labelText, memberText, errorText))
         else:
             repoText = ""
             try:
                 repoText = f"{'------Repo Name------': <{fill}} "
                 repoText += f"{'---Total Commits---': <{intFill}} "
                 repoText += '-----Last Commit-----\n'
-                username = searchInputBox.get()
+                username = searchName
                 uDict = getUserInfo(username)
                 rDict, errors2 = getReposForUser(username)
 
@@ -470,8 +1260,8 @@ def guiMain(args):
                     labelText +="\nRepos committed to:"
                     for r in rDict:
                         repoText += f"{r: <{fill}} "
-                        repoText += f"{rDict[r]['Total Commits']: <{intFill}} "
-                        repoText += f" {rDict[r]['Last Commit']}\n"
+                        repoText += f"{rDict[r].totalCommits: <{intFill}} "
+                        repoText += f" {rDict[r].lastCommit}\n"
                 else:
                     labelText += "\nNo repos with commits found for user"
 
@@ -482,12 +1272,22 @@ def guiMain(args):
             except Exception as err2:
                     errorText = "Could not obtain repositories for user "
                     errorText += f"'{username}'\n{str(err2)}"
-            queryLabelText.set(labelText)
-            resultBox.delete("1.0", END)
-            resultBox.insert(INSERT, repoText)
+            searchResults.put((labelText, repoText, errorText))
 
+    def showSearchResults():
+        # Checks for a finished search, and checks again shortly if the search
+        # is still running.
+        try:
+            labelText, resultText, errorText = searchResults.get_nowait()
+        except queue.Empty:
+            top.after(100, showSearchResults)
+            return
+        queryLabelText.set(labelText)
+        resultBox.delete("1.0", END)
+        resultBox.insert(INSERT, resultText)
         errorBox.delete("1.0", END)
         errorBox.insert(INSERT, errorText)
+        startButton.config(state=NORMAL)
 
     startButton = Button(searchFrame, text="Search", width=32, command=performSearch)
     searchInputBox.bind('<Return>', performSearch)
@@ -517,10 +1317,20 @@ if __name__=="__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('-g','--gui', action='store_true',
                         help='Include to run with GUI. Default is command line.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Include to not cache search results on disk between runs.')
     args = vars(parser.parse_args(sys.argv[1:]))
+    if not args['no_cache']:
+        SESSION.close()
+        SESSION = createSession(useDiskCache=True)
     # print(args)
-    if args['gui']:
-        print("Starting GUI")
-        guiMain(args)
-    else:
-        cmdMain(args)
+    # Closing the window or pressing Ctrl-C during a search leaves its
+    # requests queued on the pools, so they are cancelled on the way out.
+    try:
+        if args['gui']:
+            print("Starting GUI")
+            guiMain(args)
+        else:
+            cmdMain(args)
+    finally:
+        cancelRequests()